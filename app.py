@@ -11,12 +11,51 @@ Advanced Data Refinery - OpenRefine升级版
 import streamlit as st
 import pandas as pd
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 import json
 import io
+import hashlib
 from datetime import datetime
 import re
+import math
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from enum import IntEnum
+from pandas.api.types import is_datetime64_any_dtype, is_object_dtype, is_string_dtype
+
+try:
+    import orjson
+except ImportError:  # orjson 可选，缺失时回退到标准库 json
+    orjson = None
+
+# 写时复制：浅拷贝的 DataFrame 只在列被改写时才分配内存 (pandas >= 3.0 默认开启)
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+# ========== Precompiled Patterns ==========
+# 歧义检测用：d/m/y 或 m/d/y
+_DATE_DMY = re.compile(r'^(\d{1,2})[-/](\d{1,2})[-/](\d{4})$')
+# 类型检测用：y-m-d、d/m/y 与 y.m.d 三种日期格式合并为一个正则
+_DATE_ANY = re.compile(r'^(?:\d{4}[-/]\d{1,2}[-/]\d{1,2}|\d{1,2}[-/]\d{1,2}[-/]\d{4}|\d{4}\.\d{1,2}\.\d{1,2})$')
+# 时间 (可带 AM/PM) 后的时区后缀 (Z / UTC / +08:00 / -0500)，保留前面的时间部分
+_TZ_SUFFIX = re.compile(
+    r'(\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:\s*[AP]M)?)\s*(?:Z|UTC|[+-]\d{2}(?::?\d{2})?)$', re.IGNORECASE
+)
+_EMAIL_RE = re.compile(r'^[^\s@]+@[^\s@]+\.[^\s@]+$')
+# 邮箱初步识别：对 # 号宽容，只要 "字母 + @或# + 字母" 即可
+_EMAIL_LIKE = re.compile(r'[a-zA-Z0-9._%+-]+[@#][a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+_NUM_EXTRACT = re.compile(r'([-+]?\d*\.?\d+)')
+
+# 无效占位符 (小写)
+_NULL_KEYWORDS = frozenset({'unknown', 'not a number', 'not_a_number', 'nan', 'n/a', '?', 'none', 'null', '-', 'undefined', ''})
+
+# 邮箱中误写的 # 与全角＠统一为 @
+_EMAIL_FIX = str.maketrans({'#': '@', '＠': '@'})
 
+# 货币符号、千分位与空格 ($7,000 -> 7000)
+_CURRENCY_TABLE = str.maketrans('', '', '$￥, ')
 
 
 # ========== Page Config ==========
@@ -130,10 +169,9 @@ st.markdown("""
         box-shadow: 0 2px 4px rgba(0,0,0,0.05);
     }
 
-    /* Code Block */
-    .code-block {
-        background: #1e293b;
-        color: #10b981;
+    /* JSON Viewer (直接作用于 st.json，无需额外包裹元素) */
+    .stJson, [data-testid="stJson"] {
+        background: #f8fafc;
         padding: 1rem;
         border-radius: 8px;
         font-family: 'Courier New', monospace;
@@ -146,167 +184,504 @@ st.markdown("""
 
 # ========== Core Functions ==========
 
+def _match_share(arr, pattern):
+    """Arrow 字符串数组中从开头匹配 pattern 的比例 (在 Arrow 的 C++ 正则内核中执行)"""
+    hits = pc.sum(pc.match_substring_regex(arr, pattern)).as_py() or 0
+    return hits / len(arr)
+
+
+def _as_string(series):
+    """返回 pandas 字符串类型的 Series；已是 StringDtype 时直接复用，不再生成 object 数组
+
+    其它类型 (object、数值、ArrowDtype 列等) 统一转为 'string[pyarrow]'，
+    保证 .str.extract 等方法的行为一致。
+    """
+    if isinstance(series.dtype, pd.StringDtype):
+        return series
+    return series.astype('string[pyarrow]')
+
+
+_ARROW_STRING = pd.StringDtype('pyarrow')
+
+
+def _use_arrow_strings(df):
+    """把 object 列与 pandas 3 默认的 str 列转为 Arrow 字符串列，后续 .str 操作走 Arrow 内核
+
+    显式检查 dtype，不依赖 select_dtypes('object') 在 pandas 3 中已弃用的隐式包含 str 列的行为。
+    """
+    text_columns = [
+        col for col, dtype in df.dtypes.items()
+        if dtype != _ARROW_STRING and (is_object_dtype(dtype) or is_string_dtype(dtype))
+    ]
+    if not text_columns:
+        return df
+    return df.astype({col: _ARROW_STRING for col in text_columns})
+
+
+def _parse_number(text):
+    """单个字符串转数值：先直接转换 (支持全角等 Unicode 数字与 1_000 写法)，失败再正则提取第一个数字"""
+    try:
+        num = float(text)
+        if math.isfinite(num):
+            return num
+    except ValueError:
+        pass
+    match = _NUM_EXTRACT.search(text)
+    return float(match.group()) if match else np.nan
+
+
+def _to_datetime_column(s):
+    """整列解析日期，失败返回 None
+
+    时区混用时 pandas 3 直接报错 (errors='coerce' 也不例外)，pandas 2 则返回 object 列，两种情况都视为失败。
+    """
+    try:
+        parsed = pd.to_datetime(s, errors='coerce', format='mixed')
+    except ValueError:
+        return None
+    return parsed if is_datetime64_any_dtype(parsed) else None
+
+
+def _format_dates(s):
+    """把字符串列解析为 YYYY-MM-DD 字符串，无法解析的为缺失值
+
+    整列解析失败时先去掉时间后的时区偏移再试，仍失败则逐个单元格解析；均按各自当地时间取日期。
+    """
+    parsed = _to_datetime_column(s)
+    if parsed is None:
+        parsed = _to_datetime_column(s.str.replace(_TZ_SUFFIX, r'\1', regex=True))
+    if parsed is not None:
+        return parsed.dt.strftime('%Y-%m-%d')
+
+    dates = []
+    for value in s.to_numpy(dtype=object, na_value=None):
+        try:
+            stamp = pd.NaT if value is None else pd.to_datetime(value, errors='coerce')
+        except (ValueError, OverflowError):
+            stamp = pd.NaT
+        dates.append(None if pd.isna(stamp) else stamp.strftime('%Y-%m-%d'))
+    return pd.Series(dates, index=s.index, dtype='string[pyarrow]')
+
+
+def _range_mask(nums, lo, hi):
+    """对 float64 数组做整块范围比较，返回 (低于下限, 高于上限) 两个布尔掩码"""
+    return nums < lo, nums > hi
+
+
 class FieldTypeDetector:
     """AI驱动的字段类型检测引擎"""
 
+    SAMPLE_SIZE = 1000
+    BOOL_VALUES = frozenset(['true', 'false', 'yes', 'no', '1', '0', 'y', 'n', 't', 'f'])
+
     @staticmethod
     def detect_type(series):
-        """自动检测字段类型"""
-        # 移除空值
+        """自动检测字段类型（大列只抽样检测）"""
+        # 移除空值，超过 SAMPLE_SIZE 时固定种子抽样
         non_null = series.dropna()
         if len(non_null) == 0:
             return 'text'
+        if len(non_null) > FieldTypeDetector.SAMPLE_SIZE:
+            non_null = non_null.sample(FieldTypeDetector.SAMPLE_SIZE, random_state=0)
+        values = pa.array(_as_string(non_null), type=pa.string())
 
-        # 数字检测
-        numeric_count = pd.to_numeric(non_null, errors='coerce').notna().sum()
-        if numeric_count / len(non_null) > 0.8:
+        # 数字检测 (Arrow 字符串列经 to_numeric 得到的是 NaN 而非缺失值，需用 isnan 判断)
+        numeric = pd.to_numeric(non_null, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        if np.count_nonzero(~np.isnan(numeric)) / len(values) > 0.8:
             return 'number'
 
         # 日期检测
-        date_patterns = [
-            r'^\d{4}[-/]\d{1,2}[-/]\d{1,2}$',
-            r'^\d{1,2}[-/]\d{1,2}[-/]\d{4}$',
-            r'^\d{4}\.\d{1,2}\.\d{1,2}$'
-        ]
-        date_count = sum(
-            non_null.astype(str).str.match(pattern).sum()
-            for pattern in date_patterns
-        )
-        if date_count / len(non_null) > 0.7:
+        if _match_share(values, _DATE_ANY.pattern) > 0.7:
             return 'date'
 
         # 邮箱检测
-        if 'email' in series.name.lower() or 'mail' in series.name.lower():
+        name = str(series.name).lower()
+        if 'email' in name or 'mail' in name:
             return 'email'
 
-            # 邮箱检测：增加对 # 号的宽容度，用于初次识别
-            # 只要包含 "字母 + @或# + 字母" 就初步认定为邮箱
-        email_like_pattern = r'[a-zA-Z0-9._%+-]+[@#][a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        email_hits = non_null.str.match(email_like_pattern).sum()
-        if email_hits / len(non_null) > 0.6:  # 只要有 60% 像邮箱就认定是
+        if _match_share(values, '^' + _EMAIL_LIKE.pattern) > 0.6:  # 只要有 60% 像邮箱就认定是
             return 'email'
 
         # 布尔检测
-        bool_values = ['true', 'false', 'yes', 'no', '1', '0', 'y', 'n', 'T', 'F']
-        bool_count = non_null.astype(str).str.lower().isin(bool_values).sum()
-        if bool_count / len(non_null) > 0.8:
+        bool_values = pa.array(sorted(FieldTypeDetector.BOOL_VALUES))
+        bool_count = pc.sum(pc.is_in(pc.utf8_lower(values), value_set=bool_values)).as_py() or 0
+        if bool_count / len(values) > 0.8:
             return 'boolean'
 
         return 'text'
 
 
+class Issue(IntEnum):
+    """清洗问题类型，日志中只存整数编码"""
+    OUT_OF_RANGE = 0
+    INVALID_FORMAT = 1
+    AMBIGUOUS_DATE = 2
+    NOT_NUMERIC = 3
+    INVALID_EMAIL = 4
+    PLACEHOLDER_VALUE = 5
+
+
+# 编码 -> 日志/界面使用的字符串名称 (如 'out_of_range')
+ISSUE_NAMES = tuple(issue.name.lower() for issue in Issue)
+
+
+class CleaningLog:
+    """列式清洗日志：每个字段一个列表，只在界面需要时才转换为字典记录
+
+    issue 存 Issue 编码，column 存 self.columns 中的下标，转换时再还原为字符串。
+    """
+
+    FIELDS = ('row', 'column', 'raw', 'cleaned', 'issue', 'rule', 'hint')
+
+    def __init__(self):
+        self.data = {field: [] for field in self.FIELDS}
+        self.columns = []
+        self._column_codes = {}
+
+    def __len__(self):
+        return len(self.data['row'])
+
+    def _column_code(self, column):
+        code = self._column_codes.get(column)
+        if code is None:
+            code = self._column_codes[column] = len(self.columns)
+            self.columns.append(column)
+        return code
+
+    def append(self, row, column, raw, cleaned, issue, rule=None, hint=None):
+        data = self.data
+        data['row'].append(row)
+        data['column'].append(self._column_code(column))
+        data['raw'].append(raw)
+        data['cleaned'].append(cleaned)
+        data['issue'].append(int(issue))
+        data['rule'].append(rule)
+        data['hint'].append(hint)
+
+    def extend(self, other):
+        """按顺序合并另一份日志"""
+        remap = [self._column_code(column) for column in other.columns]
+        for field in self.FIELDS:
+            if field == 'column':
+                self.data['column'].extend(remap[code] for code in other.data['column'])
+            else:
+                self.data[field].extend(other.data[field])
+
+    def issue_counts(self):
+        """各问题类型的数量 {issue 名称: 数量}"""
+        counts = np.bincount(self.data['issue'], minlength=len(Issue))
+        return {ISSUE_NAMES[code]: int(count) for code, count in enumerate(counts) if count}
+
+    def records(self):
+        """按需转换为 list[dict]，不在日志对象上保留，避免列式数据之外再常驻一份字典记录"""
+        data = dict(self.data)
+        data['column'] = [self.columns[code] for code in data['column']]
+        data['issue'] = [ISSUE_NAMES[code] for code in data['issue']]
+        return [dict(zip(self.FIELDS, values)) for values in zip(*(data[f] for f in self.FIELDS))]
+
+    def take(self, positions):
+        """只把指定位置的日志转换为字典记录，供分页展示使用"""
+        records = []
+        for i in positions:
+            record = {field: self.data[field][i] for field in self.FIELDS}
+            record['column'] = self.columns[record['column']]
+            record['issue'] = ISSUE_NAMES[record['issue']]
+            records.append(record)
+        return records
+
+    def to_frame(self):
+        """转换为 DataFrame (column/issue 为 Categorical)，用于表格展示与向量化筛选"""
+        frame = pd.DataFrame(self.data)
+        frame['column'] = pd.Categorical.from_codes(self.data['column'], categories=self.columns)
+        frame['issue'] = pd.Categorical.from_codes(self.data['issue'], categories=ISSUE_NAMES)
+        return frame
+
+
 class DataCleaner:
     """高级数据清洗引擎 (修复版)"""
 
     def __init__(self):
-        self.cleaning_log = []
-        self.rules = {
+        self.log = CleaningLog()
+        rules = {
             'age': {'min': 0, 'max': 120},
             'salary': {'min': 0, 'max': 10000000},
             'price': {'min': 0, 'max': 1000000},
             'quantity': {'min': 0, 'max': 100000}
         }
+        # 各列在不同线程中并发读取规则，只读视图保证无需加锁
+        self.rules = MappingProxyType({key: MappingProxyType(rule) for key, rule in rules.items()})
 
-    def add_log(self, row, col, raw, cleaned, issue, hint=None, rule=None):
-        self.cleaning_log.append({
-            'row': row + 1,
-            'column': col,
-            'raw': raw,
-            'cleaned': cleaned,
-            'issue': issue,
-            'rule': rule,
-            'hint': hint
-        })
-
-    def clean_numeric(self, value, row_idx, col_name):
-        if pd.isna(value) or str(value).strip() == "":
-            return None
-
-        raw_str = str(value).strip()
-        str_val = raw_str.lower()
-
-        # 1. 识别无效占位符
-        null_keywords = ['unknown', 'not a number', 'not_a_number', 'nan', 'n/a', '?', 'none', 'null', '-', 'undefined']
-        if str_val in null_keywords:
-            self.add_log(row_idx, col_name, raw_str, None, 'placeholder_value', f'识别为无效占位符: {raw_str}')
-            return None
-
-        # 2. 预处理：移除干扰符号 ($7,000 -> 7000)
-        temp_val = str_val.replace('$', '').replace('￥', '').replace(',', '')
-        clean_num_match = re.search(r'[-+]?\d*\.?\d+', temp_val)
-
-        try:
-            if not clean_num_match:
-                raise ValueError
-            num = float(clean_num_match.group())
-        except (ValueError, TypeError):
-            self.add_log(row_idx, col_name, raw_str, None, 'not_numeric', '无法解析为数值')
-            return None
-
-        # 3. 范围检查
+    def _range_bounds(self, col_name):
+        """合并所有匹配该列名的规则，返回 (最小值, 最大值)"""
+        lo, hi = -np.inf, np.inf
         col_lower = col_name.lower()
         for rule_key, rule_val in self.rules.items():
             if rule_key in col_lower:
-                if 'min' in rule_val and num < rule_val['min']:
-                    self.add_log(row_idx, col_name, raw_str, None, 'out_of_range', '数值低于最小值')
-                    return None
-                if 'max' in rule_val and num > rule_val['max']:
-                    self.add_log(row_idx, col_name, raw_str, None, 'out_of_range', '数值超出最大值')
-                    return None
-        return num
-
-    def clean_date(self, value, row_idx, col_name):
-        if pd.isna(value): return value
-        str_val = str(value).strip().lower()
-
-        # 简单日期转换逻辑 (保留你之前的)
-        match = re.match(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})$', str_val)
-        if match:
-            y, m, d = match.groups()
-            return f"{y}-{m.zfill(2)}-{d.zfill(2)}"
-        return value
-
-    def clean_email(self, value, row_idx, col_name):
-        if pd.isna(value): return value
-        email = str(value).strip().lower().replace('#', '@')
-        return email
+                lo = max(lo, rule_val.get('min', -np.inf))
+                hi = min(hi, rule_val.get('max', np.inf))
+        return lo, hi
+
+    def _clean_numeric_column(self, series, col_name, log):
+        """整列向量化数值清洗：占位符与无法解析的值记录日志，越界值置空"""
+        raw = _as_string(series).str.strip()
+        s = raw.str.lower()
+
+        # 1. 空值不记录日志，占位符记录日志
+        blank = series.isna().to_numpy() | (raw == '').to_numpy(dtype=bool, na_value=True)
+        placeholder = s.isin(_NULL_KEYWORDS).to_numpy() & ~blank
+
+        # 2. 移除干扰符号后整列直接转换 (Arrow 内核只认 ASCII 数字)，
+        #    失败的单元格逐个用 _parse_number 兜底，处理全角/其他 Unicode 数字、1_000 及 "12kg" 等
+        compact = s.str.translate(_CURRENCY_TABLE)
+        nums = pd.to_numeric(compact, errors='coerce').to_numpy(dtype=float, na_value=np.nan, copy=True)
+        nums[blank | placeholder | ~np.isfinite(nums)] = np.nan
+        retry = np.isnan(nums) & ~blank & ~placeholder
+        if retry.any():
+            nums[retry] = [_parse_number(text) for text in compact[retry].to_numpy(dtype=object)]
+        not_numeric = np.isnan(nums) & ~blank & ~placeholder
+
+        issues = np.zeros(len(s), dtype=np.int8)
+        hints = np.full(len(s), None, dtype=object)
+        issues[placeholder] = Issue.PLACEHOLDER_VALUE
+        hints[placeholder] = ('识别为无效占位符: ' + raw[placeholder]).to_numpy(dtype=object)
+        issues[not_numeric] = Issue.NOT_NUMERIC
+        hints[not_numeric] = '无法解析为数值'
+        flagged = placeholder | not_numeric
+
+        # 3. 范围检查：越界值置空
+        lo, hi = self._range_bounds(col_name)
+        below, above = _range_mask(nums, lo, hi)
+        issues[below | above] = Issue.OUT_OF_RANGE
+        hints[below] = '数值低于最小值'
+        hints[above] = '数值超出最大值'
+        nums[below | above] = np.nan
+        flagged |= below | above
+
+        raw_values = raw.to_numpy(dtype=object)
+        for i in np.flatnonzero(flagged):
+            log.append(int(i) + 1, col_name, raw_values[i], None, issues[i], hint=hints[i])
+        return pd.Series(nums, index=series.index)
+
+    def _clean_email_column(self, series, col_name, log):
+        """整列向量化邮箱清洗，格式错误的邮箱记录日志但保留清洗值"""
+        missing = series.isna().to_numpy()
+        stripped = _as_string(series).str.strip()
+        s = stripped.str.lower().str.translate(_EMAIL_FIX)
+
+        # Arrow 字符串列上正则在 C++ 内核中整列执行，无需额外粗筛
+        # (传入模式字符串：pandas 2.x 的 Arrow 字符串列不接受已编译的正则)
+        valid = s.str.match(_EMAIL_RE.pattern).to_numpy(dtype=bool, na_value=False)
+        invalid = ~valid & ~missing & (s != '').to_numpy(dtype=bool, na_value=False)
+
+        raw_values = stripped.to_numpy(dtype=object)
+        email_values = s.to_numpy(dtype=object)
+        for i in np.flatnonzero(invalid):
+            log.append(int(i) + 1, col_name, raw_values[i], email_values[i], Issue.INVALID_EMAIL, hint='邮箱格式不正确')
+        return s.where(~missing, series)
+
+    def _clean_date_column(self, series, col_name, log):
+        """整列向量化日期清洗，统一为 YYYY-MM-DD，无法解析的保留原始值"""
+        missing = series.isna().to_numpy()
+        raw = _as_string(series).str.strip()
+        today = pd.Timestamp.now().normalize()
+        s = raw.str.lower().replace({
+            'today': today.strftime('%Y-%m-%d'),
+            'yesterday': (today - pd.Timedelta(days=1)).strftime('%Y-%m-%d'),
+        })
 
-    def clean_dataframe(self, df, field_types):
-        """执行清洗管道 - 已修复变量名错误"""
-        self.cleaning_log = []
-        df_cleaned = df.copy()
-        df_original = df.copy()
+        formatted = _format_dates(s)
+        invalid = formatted.isna().to_numpy() & ~missing & (raw != '').to_numpy(dtype=bool, na_value=False)
+
+        # 歧义检测：d/m/y 与 m/d/y 都合法 (如 01/02/2024)
+        parts = s.str.extract(_DATE_DMY)
+        p1 = pd.to_numeric(parts[0], errors='coerce')
+        p2 = pd.to_numeric(parts[1], errors='coerce')
+        ambiguous = ((p1 <= 12) & (p2 <= 12) & (p1 != p2)).to_numpy(dtype=bool, na_value=False) & ~invalid
+
+        raw_values = raw.to_numpy(dtype=object)
+        date_values = formatted.to_numpy(dtype=object)
+        for i in np.flatnonzero(invalid | ambiguous):
+            if invalid[i]:
+                log.append(int(i) + 1, col_name, raw_values[i], None, Issue.INVALID_FORMAT, hint='无法识别的日期格式')
+            else:
+                log.append(int(i) + 1, col_name, raw_values[i], date_values[i], Issue.AMBIGUOUS_DATE,
+                           hint='按 月/日/年 解析，也可能是 日/月/年，请人工确认')
+        return formatted.where(~invalid & ~missing, series)
 
-        for col in df.columns:
-            if col not in field_types:
-                continue
+    def clean_dataframe(self, df, field_types):
+        """执行清洗管道，返回 (清洗后数据, 原始数据, CleaningLog)"""
+        self.log = CleaningLog()
+        df_cleaned = df.copy(deep=False)
+        df_original = df
+
+        # 列名只扫描一次，生成 (列名, 列清洗函数) 计划
+        column_cleaners = {
+            'number': self._clean_numeric_column,
+            'email': self._clean_email_column,
+            'date': self._clean_date_column,
+        }
+        plan = [
+            (col, column_cleaners[field_types[col]])
+            for col in df.columns
+            if field_types.get(col) in column_cleaners
+        ]
 
-            f_type = field_types[col]
+        def run(job):
+            col, clean = job
+            column_log = CleaningLog()
+            return clean(df[col], col, column_log), column_log
 
-            if f_type == 'number':
-                # 修复点：确保变量名统一为 temp_list
-                temp_list = [
-                    self.clean_numeric(val, idx, col)
-                    for idx, val in enumerate(df[col])
-                ]
-                # 修复点：使用刚才定义的 temp_list
-                df_cleaned[col] = pd.to_numeric(temp_list, errors='coerce')
+        # 各列互相独立，多列时按列并行 (pandas/Arrow 内核会释放 GIL)
+        if len(plan) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, len(plan))) as executor:
+                results = list(executor.map(run, plan))
+        else:
+            results = [run(job) for job in plan]
 
-            elif f_type == 'email':
-                df_cleaned[col] = [self.clean_email(val, idx, col) for idx, val in enumerate(df[col])]
+        # 按列顺序写回结果并合并日志；数值列已是 float64，无需再兜底转换
+        for (col, _), (values, column_log) in zip(plan, results):
+            df_cleaned[col] = values
+            self.log.extend(column_log)
 
-            elif f_type == 'date':
-                df_cleaned[col] = [self.clean_date(val, idx, col) for idx, val in enumerate(df[col])]
+        return df_cleaned, df_original, self.log
 
-        # --- 最终兜底：再次强制转换所有数值列 ---
-        for col, ftype in field_types.items():
-            if ftype == 'number' and col in df_cleaned.columns:
-                df_cleaned[col] = pd.to_numeric(df_cleaned[col], errors='coerce')
 
-        return df_cleaned, df_original, self.cleaning_log
+# ========== Cached Pipeline ==========
 
+def _hash_dataframe(df):
+    """按内容哈希 DataFrame（含列名与类型），代替 Streamlit 默认的整表序列化"""
+    content = pd.util.hash_pandas_object(df, index=True).values.tobytes()
+    return tuple(df.columns), tuple(str(t) for t in df.dtypes), content
 
 
+@st.cache_data(show_spinner=False, max_entries=16, hash_funcs={pd.DataFrame: _hash_dataframe})
+def detect_field_types(df):
+    """检测所有字段类型，数据不变时直接复用结果"""
+    detector = FieldTypeDetector()
+    return {col: detector.detect_type(df[col]) for col in df.columns}
+
+
+@st.cache_data(show_spinner=False, max_entries=4, hash_funcs={pd.DataFrame: _hash_dataframe})
+def run_cleaning_pipeline(df, field_types):
+    """执行清洗管道，数据与字段类型不变时直接复用结果，返回 (清洗后数据, CleaningLog)
+
+    缓存会序列化返回值，原始数据调用方手里已有，不再经缓存返回。
+    """
+    df_cleaned, _, log = DataCleaner().clean_dataframe(df, field_types)
+    return df_cleaned, log
+
+
+def _dumps_json(obj):
+    """序列化为紧凑的 UTF-8 JSON bytes（不缩进，格式化交给查看端），优先使用 orjson"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _dumps_jsonl(records):
+    """逐条序列化为 JSON Lines bytes，每行一条日志"""
+    if orjson is not None:
+        lines = [orjson.dumps(entry, option=orjson.OPT_NON_STR_KEYS) for entry in records]
+    else:
+        lines = [json.dumps(entry, ensure_ascii=False).encode('utf-8') for entry in records]
+    return b"\n".join(lines)
+
+
+# ========== UI Helpers ==========
+
+PREVIEW_PAGE_SIZE = 200
+JSON_INLINE_LIMIT = 200
+JSON_PREVIEW_SIZE = 500
+CARD_PAGE_SIZE = 50
+
+ISSUE_LABELS = {
+    'out_of_range': '超出范围',
+    'invalid_format': '格式错误',
+    'ambiguous_date': '日期歧义',
+    'not_numeric': '非数值',
+    'invalid_email': '邮箱格式'
+}
+
+
+def _fingerprint(df, field_types):
+    """数据内容 + 字段类型的短指纹，作为界面渲染缓存的键"""
+    columns, dtypes, content = _hash_dataframe(df)
+    digest = hashlib.blake2b(content, digest_size=8)
+    digest.update(repr((columns, dtypes, field_types)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _compute_summary(log):
+    """直接在列式日志上统计问题总数及涉及的行、列、问题类型数，返回 (名称, 数值) 元组"""
+    return (
+        ('Total Issues', len(log)),
+        ('Affected Rows', len(set(log.data['row']))),
+        ('Affected Columns', len(set(log.data['column']))),
+        ('Issue Types', len(set(log.data['issue'])))
+    )
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _encode_log(data_fp, _log):
+    """清洗日志的 JSON bytes；同一数据指纹 (数据 + 字段类型) 的清洗日志完全相同，只按指纹缓存"""
+    return _dumps_json(_log.records())
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _encode_log_csv(data_fp, _log):
+    """清洗日志的 CSV bytes (字段统一，比 JSON 更紧凑)，缓存键同 _encode_log"""
+    return _log.to_frame().to_csv(index=False).encode('utf-8')
+
+
+@st.cache_data(show_spinner=False, max_entries=4)
+def _encode_log_jsonl(data_fp, _log):
+    """清洗日志的 JSON Lines bytes，缓存键同 _encode_log"""
+    return _dumps_jsonl(_log.records())
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def _render_anomaly_cards(data_fp, filter_column, filter_issue, page, _logs):
+    """把筛选后当前页的异常日志渲染为一段 HTML，按 (数据指纹, 筛选条件, 页码) 缓存"""
+    parts = []
+    for log in _logs:
+        # 每条记录的字段只取一次
+        row, column, issue = log['row'], log['column'], log['issue']
+        raw, cleaned, rule, hint = log['raw'], log['cleaned'], log['rule'], log['hint']
+        issue_class = f"issue-{issue}"
+        # 可选的规则/提示片段在 f-string 外预先拼好
+        rule_html = (
+            '<div>'
+            '<div style="color: #64748b; font-size: 0.75rem; margin-bottom: 0.25rem;">Rule</div>'
+            f'<code style="background: #dbeafe; padding: 0.25rem 0.5rem; border-radius: 4px; font-size: 0.7rem;">{rule}</code>'
+            '</div>'
+        ) if rule else ''
+        hint_html = (
+            '<div style="margin-top: 0.75rem; background: #fef3c7; padding: 0.5rem; border-radius: 4px; font-size: 0.8rem; color: #92400e;">'
+            f'💡 {hint}</div>'
+        ) if hint else ''
+        parts.append(f"""
+            <div class="anomaly-card">
+                <div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 0.75rem;">
+                    <div>
+                        <strong>Row {row}</strong> → <strong>{column}</strong>
+                        <span class="issue-badge {issue_class}">{ISSUE_LABELS.get(issue, issue)}</span>
+                    </div>
+                </div>
+                <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 1rem; font-size: 0.875rem;">
+                    <div>
+                        <div style="color: #64748b; font-size: 0.75rem; margin-bottom: 0.25rem;">Original</div>
+                        <code style="background: #f1f5f9; padding: 0.25rem 0.5rem; border-radius: 4px;">{raw}</code>
+                    </div>
+                    <div>
+                        <div style="color: #64748b; font-size: 0.75rem; margin-bottom: 0.25rem;">Cleaned</div>
+                        <code style="background: #dcfce7; padding: 0.25rem 0.5rem; border-radius: 4px;">{cleaned if cleaned is not None else 'null'}</code>
+                    </div>
+                    {rule_html}
+                </div>
+                {hint_html}
+            </div>
+        """)
+    return "".join(parts)
 
 
 # ========== Session State Initialization ==========
@@ -319,7 +694,13 @@ if 'data_original' not in st.session_state:
 if 'field_types' not in st.session_state:
     st.session_state.field_types = {}
 if 'cleaning_log' not in st.session_state:
-    st.session_state.cleaning_log = []
+    st.session_state.cleaning_log = CleaningLog()
+if 'data_fp' not in st.session_state:
+    st.session_state.data_fp = None
+if 'log_version' not in st.session_state:
+    st.session_state.log_version = 0
+if 'log_stamp' not in st.session_state:
+    st.session_state.log_stamp = None
 if 'show_original' not in st.session_state:
     st.session_state.show_original = False
 
@@ -349,21 +730,20 @@ def main():
 
         if uploaded_file:
             try:
+                # 多线程 pyarrow / calamine 解析；Excel 的混合类型列 (如 [25, 'x']) 无法直接转为
+                # Arrow 类型，先按 object 读入，再由 _use_arrow_strings 统一转换
                 if uploaded_file.name.endswith('.csv'):
-                    df = pd.read_csv(uploaded_file)
+                    df = pd.read_csv(uploaded_file, engine='pyarrow', dtype_backend='pyarrow')
                 else:
-                    df = pd.read_excel(uploaded_file)
+                    df = pd.read_excel(uploaded_file, engine='calamine')
+                df = _use_arrow_strings(df)
 
                 st.session_state.data = df
                 st.success(f"✅ Loaded {len(df)} rows × {len(df.columns)} columns")
 
                 # 自动检测字段类型
                 if st.button("🤖 Auto-Detect Field Types", use_container_width=True):
-                    detector = FieldTypeDetector()
-                    types = {}
-                    for col in df.columns:
-                        types[col] = detector.detect_type(df[col])
-                    st.session_state.field_types = types
+                    st.session_state.field_types = detect_field_types(df)
                     st.success("✅ Field types detected!")
                     st.rerun()
 
@@ -382,15 +762,11 @@ def main():
                 'date': ['2024-01-15', '01/02/2024', '2024.03.20', '2024-04-01', 'not-a-date'],
                 'salary': [5000, 6000, -1000, 8000, 7500]
             })
+            sample_data = _use_arrow_strings(sample_data)
             st.session_state.data = sample_data
 
             # 自动检测类型
-            detector = FieldTypeDetector()
-            types = {}
-            for col in sample_data.columns:
-                if col != 'id':
-                    types[col] = detector.detect_type(sample_data[col])
-            st.session_state.field_types = types
+            st.session_state.field_types = detect_field_types(sample_data.drop(columns=['id']))
             st.success("✅ Sample data loaded!")
             st.rerun()
 
@@ -476,18 +852,26 @@ def main():
         display_df = st.session_state.data_original if view_mode == "Original" and st.session_state.data_original is not None else (
             st.session_state.data_cleaned if st.session_state.data_cleaned is not None else df)
 
+        # 分页预览：每次只把当前页发送到浏览器
+        page_count = max(1, -(-len(display_df) // PREVIEW_PAGE_SIZE))
+        page = 1
+        if page_count > 1:
+            page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="preview_page")
+        start = (page - 1) * PREVIEW_PAGE_SIZE
         st.dataframe(
-            display_df,
+            display_df.iloc[start:start + PREVIEW_PAGE_SIZE],
             use_container_width=True,
             height=400
         )
+        if page_count > 1:
+            st.caption(f"Rows {start + 1}–{min(start + PREVIEW_PAGE_SIZE, len(display_df))} of {len(display_df)}")
 
-        # 下载清洗后数据
+        # 下载清洗后数据 (点击时才生成完整 CSV)
         if st.session_state.data_cleaned is not None:
-            csv = st.session_state.data_cleaned.to_csv(index=False)
+            data_cleaned = st.session_state.data_cleaned
             st.download_button(
                 label="📥 Download Cleaned Data (CSV)",
-                data=csv,
+                data=lambda: data_cleaned.to_csv(index=False),
                 file_name=f"cleaned_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
                 mime="text/csv"
             )
@@ -547,14 +931,16 @@ def main():
             # Start Cleaning Button
             if st.button("🚀 Start Data Cleaning Pipeline", type="primary", use_container_width=True):
                 with st.spinner("🔄 Processing data..."):
-                    cleaner = DataCleaner()
-                    df_cleaned, df_original, logs = cleaner.clean_dataframe(
+                    df_cleaned, logs = run_cleaning_pipeline(
                         df,
                         st.session_state.field_types
                     )
                     st.session_state.data_cleaned = df_cleaned
-                    st.session_state.data_original = df_original
+                    st.session_state.data_original = df
                     st.session_state.cleaning_log = logs
+                    st.session_state.data_fp = _fingerprint(df, st.session_state.field_types)
+                    st.session_state.log_version += 1
+                    st.session_state.log_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
                     st.success(f"✅ Cleaning complete! Found {len(logs)} issues.")
                     st.rerun()
 
@@ -565,21 +951,8 @@ def main():
         else:
             st.subheader("🚨 Anomaly Detection Panel")
 
-            logs = st.session_state.cleaning_log
-
             # Issue Type Statistics
-            issue_counts = {}
-            for log in logs:
-                issue = log['issue']
-                issue_counts[issue] = issue_counts.get(issue, 0) + 1
-
-            issue_labels = {
-                'out_of_range': '超出范围',
-                'invalid_format': '格式错误',
-                'ambiguous_date': '日期歧义',
-                'not_numeric': '非数值',
-                'invalid_email': '邮箱格式'
-            }
+            issue_counts = st.session_state.cleaning_log.issue_counts()
 
             st.markdown("#### 📊 Issue Statistics")
             cols = st.columns(len(issue_counts))
@@ -588,7 +961,7 @@ def main():
                     st.markdown(f"""
                         <div style="background: white; padding: 1rem; border-radius: 8px; text-align: center; border: 2px solid #e2e8f0;">
                             <div style="font-size: 2rem; font-weight: 700; color: #1e293b;">{count}</div>
-                            <div style="font-size: 0.75rem; color: #64748b;">{issue_labels.get(issue, issue)}</div>
+                            <div style="font-size: 0.75rem; color: #64748b;">{ISSUE_LABELS.get(issue, issue)}</div>
                         </div>
                     """, unsafe_allow_html=True)
 
@@ -599,7 +972,7 @@ def main():
             with col1:
                 filter_column = st.selectbox(
                     "Filter by Column",
-                    ["All"] + list(set(log['column'] for log in logs))
+                    ["All"] + list(st.session_state.cleaning_log.columns)
                 )
             with col2:
                 filter_issue = st.selectbox(
@@ -608,7 +981,7 @@ def main():
                 )
             with col3:
                 if st.button("📥 Export", use_container_width=True):
-                    json_data = json.dumps(logs, indent=2, ensure_ascii=False)
+                    json_data = _encode_log(st.session_state.data_fp, st.session_state.cleaning_log)
                     st.download_button(
                         label="Download JSON",
                         data=json_data,
@@ -616,43 +989,56 @@ def main():
                         mime="application/json"
                     )
 
-            # Filter logs
-            filtered_logs = logs
+            # Filter logs (整表布尔掩码)
+            log_df = st.session_state.cleaning_log.to_frame()
             if filter_column != "All":
-                filtered_logs = [l for l in filtered_logs if l['column'] == filter_column]
+                log_df = log_df.query("column == @filter_column")
             if filter_issue != "All":
-                filtered_logs = [l for l in filtered_logs if l['issue'] == filter_issue]
-
-            st.markdown(f"#### Found {len(filtered_logs)} anomalies")
-
-            # Display anomalies
-            for log in filtered_logs:
-                issue_class = f"issue-{log['issue']}"
-                st.markdown(f"""
-                    <div class="anomaly-card">
-                        <div style="display: flex; justify-content: space-between; align-items: start; margin-bottom: 0.75rem;">
-                            <div>
-                                <strong>Row {log['row']}</strong> → <strong>{log['column']}</strong>
-                                <span class="issue-badge {issue_class}">{issue_labels.get(log['issue'], log['issue'])}</span>
-                            </div>
-                        </div>
-                        <div style="display: grid; grid-template-columns: 1fr 1fr 1fr; gap: 1rem; font-size: 0.875rem;">
-                            <div>
-                                <div style="color: #64748b; font-size: 0.75rem; margin-bottom: 0.25rem;">Original</div>
-                                <code style="background: #f1f5f9; padding: 0.25rem 0.5rem; border-radius: 4px;">{log['raw']}</code>
-                            </div>
-                            <div>
-                                <div style="color: #64748b; font-size: 0.75rem; margin-bottom: 0.25rem;">Cleaned</div>
-                                <code style="background: #dcfce7; padding: 0.25rem 0.5rem; border-radius: 4px;">{log['cleaned'] if log['cleaned'] is not None else 'null'}</code>
-                            </div>
-                            {f'''<div>
-                                <div style="color: #64748b; font-size: 0.75rem; margin-bottom: 0.25rem;">Rule</div>
-                                <code style="background: #dbeafe; padding: 0.25rem 0.5rem; border-radius: 4px; font-size: 0.7rem;">{log['rule']}</code>
-                            </div>''' if log['rule'] else ''}
-                        </div>
-                        {f'<div style="margin-top: 0.75rem; background: #fef3c7; padding: 0.5rem; border-radius: 4px; font-size: 0.8rem; color: #92400e;">💡 {log["hint"]}</div>' if log.get('hint') else ''}
-                    </div>
-                """, unsafe_allow_html=True)
+                log_df = log_df.query("issue == @filter_issue")
+
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.markdown(f"#### Found {len(log_df)} anomalies")
+            with col2:
+                anomaly_view = st.radio(
+                    "Display",
+                    ["Table", "Cards"],
+                    horizontal=True,
+                    key="anomaly_view"
+                )
+
+            if anomaly_view == "Table":
+                st.dataframe(
+                    log_df.assign(issue=log_df['issue'].map(lambda i: ISSUE_LABELS.get(i, i))),
+                    use_container_width=True,
+                    height=500,
+                    hide_index=True,
+                    column_config={
+                        'row': st.column_config.NumberColumn("Row"),
+                        'column': st.column_config.TextColumn("Column"),
+                        'raw': st.column_config.TextColumn("Original"),
+                        'cleaned': st.column_config.TextColumn("Cleaned"),
+                        'issue': st.column_config.TextColumn("Issue"),
+                        'rule': st.column_config.TextColumn("Rule"),
+                        'hint': st.column_config.TextColumn("Hint"),
+                    }
+                )
+            else:
+                # 卡片分页：每页最多 CARD_PAGE_SIZE 张，控制页面 DOM 规模
+                page_count = max(1, -(-len(log_df) // CARD_PAGE_SIZE))
+                page = 1
+                if page_count > 1:
+                    page = st.number_input("Page", min_value=1, max_value=page_count, value=1, step=1, key="card_page")
+                start = (page - 1) * CARD_PAGE_SIZE
+                filtered_logs = st.session_state.cleaning_log.take(log_df.index[start:start + CARD_PAGE_SIZE])
+
+                # Display anomalies (整段 HTML 按数据指纹、筛选条件与页码缓存，一次性输出)
+                st.markdown(
+                    _render_anomaly_cards(st.session_state.data_fp, filter_column, filter_issue, page, filtered_logs),
+                    unsafe_allow_html=True
+                )
+                if page_count > 1:
+                    st.caption(f"Entries {start + 1}–{min(start + CARD_PAGE_SIZE, len(log_df))} of {len(log_df)}")
 
     ## Tab 4: Cleaning Logs
     with tab4:
@@ -663,37 +1049,77 @@ def main():
         else:
             col1, col2 = st.columns([4, 1])
 
-            json_data = json.dumps(st.session_state.cleaning_log, indent=2, ensure_ascii=False)
+            # 延迟下载的回调在无脚本上下文的线程中执行，不能在其中读取 st.session_state，先绑定为局部变量
+            data_fp = st.session_state.data_fp
+            cleaning_log = st.session_state.cleaning_log
+            log_count = len(cleaning_log)
+            json_data = _encode_log(data_fp, cleaning_log)
+            # 文件名时间戳在每次清洗时生成一次，存于各自会话中
+            log_stem = f"cleaning_log_{st.session_state.log_stamp}"
 
             with col2:
+                # 日志字段统一，默认推荐 CSV
+                st.download_button(
+                    label="📥 下载 CSV",
+                    data=_encode_log_csv(data_fp, cleaning_log),
+                    file_name=f"{log_stem}.csv",
+                    mime="text/csv",
+                    type="primary",
+                    use_container_width=True
+                )
                 st.download_button(
                     label="📥 下载 JSON",
                     data=json_data,
-                    file_name=f"cleaning_log_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                    file_name=f"{log_stem}.json",
                     mime="application/json",
                     use_container_width=True
                 )
+                # JSONL 在点击时才生成
+                st.download_button(
+                    label="📥 下载 JSONL",
+                    data=lambda: _encode_log_jsonl(data_fp, cleaning_log),
+                    file_name=f"{log_stem}.jsonl",
+                    mime="application/x-ndjson",
+                    use_container_width=True
+                )
 
-            # Display JSON
-            st.markdown('<div class="code-block">', unsafe_allow_html=True)
-            st.json(st.session_state.cleaning_log)
-            st.markdown('</div>', unsafe_allow_html=True)
+            # Display JSON (小日志直接渲染；大日志收进折叠区，勾选后才按页渲染)
+            if log_count <= JSON_INLINE_LIMIT:
+                json_container, render_json = st.container(), True
+            else:
+                json_container = st.expander(f"Show full JSON ({log_count} entries)")
+                render_json = json_container.checkbox("Render inline (slow for large logs)", key="log_json_inline")
+
+            if render_json:
+                with json_container:
+                    page_start = 0
+                    if log_count > JSON_PREVIEW_SIZE:
+                        page_starts = range(0, log_count, JSON_PREVIEW_SIZE)
+                        page_start = st.selectbox(
+                            "Entries",
+                            page_starts,
+                            format_func=lambda i: f"{i + 1}–{min(i + JSON_PREVIEW_SIZE, log_count)}",
+                            key="log_json_page"
+                        )
+                        st.info(
+                            f"ℹ️ 共 {log_count} 条日志，此处仅显示 {JSON_PREVIEW_SIZE} 条；完整日志请下载 JSON。"
+                        )
+                    page_end = min(page_start + JSON_PREVIEW_SIZE, log_count)
+                    st.json(st.session_state.cleaning_log.take(range(page_start, page_end)))
 
             # Log Summary
             st.markdown("---")
             st.markdown("#### 📊 Log Summary")
 
-            summary_data = {
-                'Total Issues': len(st.session_state.cleaning_log),
-                'Affected Rows': len(set(log['row'] for log in st.session_state.cleaning_log)),
-                'Affected Columns': len(set(log['column'] for log in st.session_state.cleaning_log)),
-                'Issue Types': len(set(log['issue'] for log in st.session_state.cleaning_log))
-            }
+            # 汇总只在日志版本变化时重新计算
+            if st.session_state.get('summary_version') != st.session_state.log_version:
+                st.session_state.summary_cache = _compute_summary(st.session_state.cleaning_log)
+                st.session_state.summary_version = st.session_state.log_version
+            metrics = st.session_state.summary_cache
 
-            cols = st.columns(4)
-            for idx, (key, value) in enumerate(summary_data.items()):
-                with cols[idx]:
-                    st.metric(key, value)
+            cols = st.columns(len(metrics))
+            for col, (key, value) in zip(cols, metrics):
+                col.metric(key, value)
 
 # 确保文件末尾有这一行来启动应用
 if __name__ == "__main__":
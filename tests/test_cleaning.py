@@ -0,0 +1,46 @@
+import pandas as pd
+
+from app import DataCleaner, Issue, ISSUE_NAMES
+
+
+def _clean(values, field_type, name='col'):
+    df = pd.DataFrame({name: pd.Series(values, dtype='string[pyarrow]')})
+    cleaned, _, log = DataCleaner().clean_dataframe(df, {name: field_type})
+    return cleaned[name], log
+
+
+def test_date_mixed_timezones():
+    cleaned, log = _clean(
+        ['2024-01-01T00:00:00+08:00', '2024-01-02', '2024-01-03 10:00Z', 'not-a-date'], 'date', 'date'
+    )
+    assert cleaned.tolist()[:3] == ['2024-01-01', '2024-01-02', '2024-01-03']
+    assert cleaned[3] == 'not-a-date'
+    assert log.data['issue'] == [Issue.INVALID_FORMAT]
+    assert ISSUE_NAMES[log.data['issue'][0]] == 'invalid_format'
+
+
+def test_date_mixed_timezones_with_am_pm():
+    cleaned, log = _clean(['1/2/2024 10:00 AM +08:00', '2024-01-02', '2024-01-05 11:30 PM -05:00'], 'date', 'date')
+    assert cleaned.tolist() == ['2024-01-02', '2024-01-02', '2024-01-05']
+    assert len(log) == 0
+
+
+def test_date_mixed_timezones_per_cell_fallback():
+    # 偏移不在末尾，去偏移后整列仍因时区混用失败，逐个单元格解析
+    cleaned, log = _clean(['10:00 +08:00 2024-01-01', '2024-01-02', 'not-a-date'], 'date', 'date')
+    assert cleaned.tolist() == ['2024-01-01', '2024-01-02', 'not-a-date']
+    assert log.data['issue'] == [Issue.INVALID_FORMAT]
+
+
+def test_numeric_unicode_digits_and_dirty_values():
+    cleaned, log = _clean(['１２', '١٢', '1_000', '$7,000', '12kg', 'abc', 'unknown', ''], 'number', 'amount')
+    assert cleaned.tolist()[:5] == [12.0, 12.0, 1000.0, 7000.0, 12.0]
+    assert cleaned[5:].isna().all()
+    assert [ISSUE_NAMES[code] for code in log.data['issue']] == ['not_numeric', 'placeholder_value']
+
+
+def test_email_normalized_and_invalid_logged():
+    cleaned, log = _clean(['  Zhang@Example.COM ', 'li#example.com', 'lisi@example', None], 'email', 'email')
+    assert cleaned.tolist()[:3] == ['zhang@example.com', 'li@example.com', 'lisi@example']
+    assert [ISSUE_NAMES[code] for code in log.data['issue']] == ['invalid_email']
+    assert log.data['row'] == [3]